@@ -4,17 +4,22 @@ Script de despliegue programático para arquitectura serverless AWS.
 Crea S3 buckets, DynamoDB, Lambdas, IAM roles, API Gateway, y SNS.
 """
 
+import base64
+import hashlib
+import io
 import json
+import mimetypes
 import os
 import sys
+import threading
 import uuid
 import zipfile
-import shutil
-import tempfile
-import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # Configuración
@@ -24,9 +29,15 @@ REGION = os.getenv("AWS_REGION", "us-east-1")
 deployment_file = Path(__file__).parent / "deployment.json"
 EXISTING_SNS_ARN = None  # Para reutilizar SNS si ya existe
 
+# Con --force se ignora lo registrado en deployment.json y se reconcilia todo contra AWS
+FORCE = "--force" in sys.argv
+CACHED = {}  # Recursos conocidos del despliegue anterior (permite omitir comprobaciones)
+
 if deployment_file.exists():
     with open(deployment_file, 'r') as f:
         existing_config = json.load(f)
+        if not FORCE:
+            CACHED = existing_config
         SUFFIX = existing_config.get("suffix")
         EXISTING_SNS_ARN = existing_config.get("sns_topic_arn")
         print(f"[*] Reutilizando sufijo existente: {SUFFIX}")
@@ -39,20 +50,93 @@ else:
 
 PROJECT_ROOT = Path(__file__).parent.parent
 
-# Obtener ID de cuenta
-sts_client = boto3.client("sts", region_name=REGION)
-ACCOUNT_ID = sts_client.get_caller_identity()["Account"]
+# Configuración compartida de clientes: pool amplio para llamadas concurrentes y reintentos adaptativos
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"max_attempts": 10, "mode": "adaptive"},
+    tcp_keepalive=True
+)
 
 print(f"[*] Región: {REGION}")
 print(f"[*] Sufijo de despliegue: {SUFFIX}")
 
-# Clientes de AWS
-s3_client = boto3.client("s3", region_name=REGION)
-dynamodb_client = boto3.client("dynamodb", region_name=REGION)
-lambda_client = boto3.client("lambda", region_name=REGION)
-iam_client = boto3.client("iam", region_name=REGION)
-apigateway_client = boto3.client("apigatewayv2", region_name=REGION)
-sns_client = boto3.client("sns", region_name=REGION)
+# Salida por hilo: cada tarea concurrente acumula sus líneas y se imprimen juntas al terminar
+output = threading.local()
+print_lock = threading.Lock()
+
+def log(message=""):
+    """Imprime el mensaje o, si el hilo está capturando salida, lo acumula."""
+    lines = getattr(output, "lines", None)
+    if lines is None:
+        print(message)
+    else:
+        lines.append(message)
+
+def run_task(task, *args, **kwargs):
+    """Ejecuta una tarea capturando su salida y la imprime en bloque al terminar (aunque falle)."""
+    output.lines = []
+    try:
+        return task(*args, **kwargs)
+    finally:
+        lines, output.lines = output.lines, None
+        with print_lock:
+            for line in lines:
+                print(line)
+
+# Clientes de AWS (creados bajo demanda: importar el módulo no carga modelos ni llama a AWS)
+client_lock = threading.Lock()  # La sesión por defecto de boto3 no es thread-safe al crear clientes
+
+@lru_cache(maxsize=None)
+def get_client(service_name):
+    """Devuelve el cliente boto3 compartido para un servicio."""
+    with client_lock:
+        return boto3.client(service_name, region_name=REGION, config=BOTO_CONFIG)
+
+def s3_client():
+    return get_client("s3")
+
+def dynamodb_client():
+    return get_client("dynamodb")
+
+def lambda_client():
+    return get_client("lambda")
+
+def iam_client():
+    return get_client("iam")
+
+def apigateway_client():
+    return get_client("apigatewayv2")
+
+def sns_client():
+    return get_client("sns")
+
+@lru_cache(maxsize=None)
+def account_id():
+    """Obtiene el ID de cuenta (una sola llamada a STS)."""
+    return get_client("sts").get_caller_identity()["Account"]
+
+@lru_cache(maxsize=None)
+def cache_is_trusted():
+    """deployment.json solo es fiable si se generó en esta misma cuenta y región.
+    
+    El archivo está versionado en git: en un clon nuevo o tras reiniciar el Learner Lab
+    puede describir recursos de otra cuenta que no existen (o no son nuestros).
+    """
+    if not CACHED:
+        return False
+    if CACHED.get("account_id") != account_id() or CACHED.get("region") != REGION:
+        log("    ℹ deployment.json pertenece a otra cuenta/región, se ignora")
+        return False
+    return True
+
+def cached(key):
+    """Devuelve un valor del despliegue anterior solo si deployment.json es fiable."""
+    return CACHED.get(key) if cache_is_trusted() else None
+
+@lru_cache(maxsize=None)
+def table_exists_waiter():
+    """Waiter reutilizado (evita volver a cargar el modelo del waiter en cada uso)."""
+    return dynamodb_client().get_waiter("table_exists")
 
 # Nombres de recursos
 BUCKET_UPLOADS = f"inventory-uploads-{SUFFIX}"
@@ -63,55 +147,113 @@ LAMBDA_API_NAME = "get_inventory_api"
 LAMBDA_NOTIFY_NAME = "notify_low_stock"
 IAM_ROLE_LAMBDA = f"lambda-inventory-role-{SUFFIX}"
 SNS_TOPIC_NAME = "low-stock-inventory-main"  # Nombre FIJO para evitar crear múltiples temas
+LAMBDA_PACKAGES_PREFIX = "_deploy/"  # Paquetes ZIP de las Lambdas dentro del bucket de uploads
+
+# Content-Type por extensión para el contenido web
+CONTENT_TYPES = {
+    ".html": "text/html",
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".svg": "image/svg+xml"
+}
 
 # ===== S3 =====
 def create_s3_buckets():
     """Verifica y reutiliza buckets S3 existentes, o los crea si no existen."""
-    print("\n[*] Verificando buckets S3...")
+    log("\n[*] Verificando buckets S3...")
+    
+    versioning_enabled = False
     
     for bucket_name in [BUCKET_UPLOADS, BUCKET_WEB]:
-        bucket_exists = False
+        # Comprobar siempre con head_bucket: en us-east-1 CreateBucket sobre un bucket
+        # propio responde 200 (y restablece sus ACL), y en AWS Academy puede estar denegado
+        registered = bucket_name in (cached("bucket_uploads"), cached("bucket_web"))
+        reuse = False
         try:
-            s3_client.head_bucket(Bucket=bucket_name)
-            bucket_exists = True
-            print(f"    ℹ Bucket {bucket_name} ya existe (reutilizando)")
+            s3_client().head_bucket(Bucket=bucket_name)
+            reuse = True
+            if registered:
+                log(f"    ℹ Bucket {bucket_name} registrado en deployment.json (reutilizando)")
+            else:
+                log(f"    ℹ Bucket {bucket_name} ya existe (reutilizando)")
         except ClientError:
-            pass  # Bucket no existe, se intentará crear
+            if registered:
+                log(f"    ⚠ Bucket {bucket_name} registrado pero no existe, se vuelve a crear")
         
-        if not bucket_exists:
+        if not reuse:
+            # Crear (BucketAlreadyOwnedByYou cubre una creación concurrente fuera de us-east-1)
             try:
-                s3_client.create_bucket(
+                s3_client().create_bucket(
                     Bucket=bucket_name,
                     CreateBucketConfiguration={"LocationConstraint": REGION} if REGION != "us-east-1" else {}
                 )
-                print(f"    ✓ Bucket {bucket_name} creado")
+                log(f"    ✓ Bucket {bucket_name} creado")
             except ClientError as e:
                 if e.response["Error"]["Code"] == "BucketAlreadyOwnedByYou":
-                    print(f"    ℹ Bucket {bucket_name} ya existe")
+                    log(f"    ℹ Bucket {bucket_name} ya existe (reutilizando)")
                 elif "AccessDenied" in str(e) or "explicit deny" in str(e):
-                    print(f"    ⚠ No se puede crear {bucket_name} (AWS Academy). Verifica deployment.json.")
+                    log(f"    ⚠ No se puede crear {bucket_name} (AWS Academy). Verifica deployment.json.")
                     raise
                 else:
                     raise
         
-        # Habilitar versionado en bucket de uploads
+        # Habilitar versionado en bucket de uploads (solo si aún no lo está)
         if bucket_name == BUCKET_UPLOADS:
+            if reuse and registered and cached("versioning_enabled"):
+                versioning_enabled = True
+                continue
             try:
-                s3_client.put_bucket_versioning(
-                    Bucket=bucket_name,
-                    VersioningConfiguration={"Status": "Enabled"}
-                )
-                print(f"    ✓ Versionado habilitado en {bucket_name}")
+                versioning = s3_client().get_bucket_versioning(Bucket=bucket_name)
+                if versioning.get("Status") != "Enabled":
+                    s3_client().put_bucket_versioning(
+                        Bucket=bucket_name,
+                        VersioningConfiguration={"Status": "Enabled"}
+                    )
+                    log(f"    ✓ Versionado habilitado en {bucket_name}")
+                else:
+                    log(f"    ℹ Versionado ya habilitado en {bucket_name}")
+                versioning_enabled = True
             except:
                 pass  # Ya puede estar habilitado
+    
+    return versioning_enabled
+
+def configure_packages_lifecycle():
+    """Caduca los paquetes Lambda de _deploy/ (y sus versiones antiguas) al día siguiente.
+    
+    Lambda guarda su propia copia del código al crear/actualizar, así que los ZIP solo
+    hacen falta durante el despliegue. La regla evita que se acumulen en el bucket
+    versionado sin añadir llamadas de borrado a cada despliegue.
+    """
+    try:
+        s3_client().put_bucket_lifecycle_configuration(
+            Bucket=BUCKET_UPLOADS,
+            LifecycleConfiguration={
+                "Rules": [
+                    {
+                        "ID": "expire-lambda-packages",
+                        "Filter": {"Prefix": LAMBDA_PACKAGES_PREFIX},
+                        "Status": "Enabled",
+                        "Expiration": {"Days": 1},
+                        "NoncurrentVersionExpiration": {"NoncurrentDays": 1}
+                    }
+                ]
+            }
+        )
+    except ClientError as e:
+        log(f"    ⚠ No se pudo configurar la caducidad de {LAMBDA_PACKAGES_PREFIX}: {e}")
 
 # ===== DynamoDB =====
 def create_dynamodb_table():
     """Crea tabla DynamoDB con Streams habilitados."""
-    print("\n[*] Creando tabla DynamoDB...")
+    log("\n[*] Creando tabla DynamoDB...")
     
     try:
-        response = dynamodb_client.create_table(
+        response = dynamodb_client().create_table(
             TableName=TABLE_NAME,
             KeySchema=[
                 {"AttributeName": "Store", "KeyType": "HASH"},
@@ -127,24 +269,25 @@ def create_dynamodb_table():
                 "StreamViewType": "NEW_AND_OLD_IMAGES"
             }
         )
-        print(f"    ✓ Tabla {TABLE_NAME} creada")
+        log(f"    ✓ Tabla {TABLE_NAME} creada")
         
         # Esperar a que la tabla esté activa
-        waiter = dynamodb_client.get_waiter("table_exists")
-        waiter.wait(TableName=TABLE_NAME)
-        print(f"    ✓ Tabla {TABLE_NAME} lista")
+        table_exists_waiter().wait(TableName=TABLE_NAME)
+        log(f"    ✓ Tabla {TABLE_NAME} lista")
         
         return response["TableDescription"]["TableArn"]
     except ClientError as e:
         if e.response["Error"]["Code"] == "ResourceInUseException":
-            print(f"    ℹ Tabla {TABLE_NAME} ya existe")
-            response = dynamodb_client.describe_table(TableName=TABLE_NAME)
+            log(f"    ℹ Tabla {TABLE_NAME} ya existe")
+            response = dynamodb_client().describe_table(TableName=TABLE_NAME)
+            # TableArn es inmutable: no hace falta volver a consultarlo tras habilitar Streams
+            table_arn = response["Table"]["TableArn"]
 
             # Si la tabla existía sin streams, habilitarlos para permitir eventos INSERT/MODIFY
             stream_spec = response["Table"].get("StreamSpecification", {})
             if not stream_spec.get("StreamEnabled"):
-                print("    ℹ Habilitando Streams en tabla existente...")
-                dynamodb_client.update_table(
+                log("    ℹ Habilitando Streams en tabla existente...")
+                dynamodb_client().update_table(
                     TableName=TABLE_NAME,
                     StreamSpecification={
                         "StreamEnabled": True,
@@ -152,29 +295,50 @@ def create_dynamodb_table():
                     }
                 )
                 # Esperar a que la actualización termine
-                waiter = dynamodb_client.get_waiter("table_exists")
-                waiter.wait(TableName=TABLE_NAME)
-                response = dynamodb_client.describe_table(TableName=TABLE_NAME)
-                print("    ✓ Streams habilitados en tabla existente")
+                table_exists_waiter().wait(TableName=TABLE_NAME)
+                log("    ✓ Streams habilitados en tabla existente")
 
-            return response["Table"]["TableArn"]
+            return table_arn
         else:
             raise
 
 # ===== IAM =====
+role_lock = threading.Lock()
+resolved_role_arn = None  # Rol resuelto vía IAM si el ARN derivado de LabRole no es válido
+
 def create_iam_role():
-    """Usa el rol LabRole existente en AWS Academy (no puede crear roles personalizados)."""
-    print("\n[*] Buscando rol IAM existente...")
+    """Usa el rol LabRole existente en AWS Academy (no puede crear roles personalizados).
+    
+    El ARN de LabRole es determinista, así que se deriva del ID de cuenta sin consultar IAM.
+    Si resulta no ser válido, create_lambda recurre a resolve_iam_role().
+    """
+    log("\n[*] Usando rol IAM LabRole...")
+    role_arn = f"arn:aws:iam::{account_id()}:role/LabRole"
+    log(f"    ℹ ARN: {role_arn}")
+    return role_arn
+
+def resolve_iam_role():
+    """Busca LabRole en IAM o, si no existe, crea un rol personalizado (solo una vez)."""
+    global resolved_role_arn
+    
+    with role_lock:
+        if resolved_role_arn is None:
+            resolved_role_arn = lookup_or_create_iam_role()
+        return resolved_role_arn
+
+def lookup_or_create_iam_role():
+    """Consulta LabRole en IAM o crea un rol personalizado para cuentas no-Academy."""
+    log("\n[*] Buscando rol IAM existente...")
     
     # AWS Academy Learner Lab usa el rol LabRole preconfigurado
     try:
-        response = iam_client.get_role(RoleName="LabRole")
+        response = iam_client().get_role(RoleName="LabRole")
         role_arn = response["Role"]["Arn"]
-        print(f"    ✓ Usando rol existente: LabRole")
-        print(f"    ℹ ARN: {role_arn}")
+        log(f"    ✓ Usando rol existente: LabRole")
+        log(f"    ℹ ARN: {role_arn}")
         return role_arn
     except ClientError as e:
-        print(f"    ⚠ No se encontró LabRole, intentando crear rol personalizado...")
+        log(f"    ⚠ No se encontró LabRole, intentando crear rol personalizado...")
         
         # Fallback: intentar crear rol personalizado (funcionará en cuentas no-Academy)
         assume_role_policy = {
@@ -189,112 +353,151 @@ def create_iam_role():
         }
         
         try:
-            response = iam_client.create_role(
+            response = iam_client().create_role(
                 RoleName=IAM_ROLE_LAMBDA,
                 AssumeRolePolicyDocument=json.dumps(assume_role_policy),
                 Description="Rol para Lambdas de inventario"
             )
             role_arn = response["Role"]["Arn"]
-            print(f"    ✓ Rol {IAM_ROLE_LAMBDA} creado")
+            log(f"    ✓ Rol {IAM_ROLE_LAMBDA} creado")
             
             # Adjuntar política AWS managed para Lambda
-            iam_client.attach_role_policy(
+            iam_client().attach_role_policy(
                 RoleName=IAM_ROLE_LAMBDA,
                 PolicyArn="arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
             )
-            print(f"    ✓ Política básica adjuntada")
+            log(f"    ✓ Política básica adjuntada")
             
             return role_arn
         except ClientError as create_error:
-            print(f"    ✗ Error: {create_error}")
+            log(f"    ✗ Error: {create_error}")
             raise
 
 # ===== Lambda =====
-def zip_lambda(source_dir, output_zip):
-    """Crea un archivo ZIP con el código Lambda."""
-    if output_zip.exists():
-        output_zip.unlink()
+def iter_files(root_dir):
+    """Genera (ruta absoluta, ruta relativa con '/') de cada archivo bajo root_dir."""
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        for filename in filenames:
+            abs_path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(abs_path, root_dir).replace(os.sep, "/")
+            yield abs_path, rel_path
+
+def build_lambda_zip(source_dir):
+    """Crea en memoria un ZIP con el código Lambda y devuelve sus bytes."""
+    buffer = io.BytesIO()
     
-    with zipfile.ZipFile(output_zip, "w", zipfile.ZIP_DEFLATED) as zf:
-        for file_path in Path(source_dir).rglob("*"):
-            if file_path.is_file():
-                arcname = file_path.relative_to(source_dir)
-                zf.write(file_path, arcname)
+    # Sin compresión: los paquetes son pequeños y así el empaquetado no consume CPU
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        for abs_path, arcname in iter_files(source_dir):
+            zf.write(abs_path, arcname)
     
-    return output_zip
+    return buffer.getvalue()
 
-def create_lambda(name, source_dir, role_arn, handler, timeout=30, memory=256, environment=None):
-    """Crea o actualiza una función Lambda."""
-    print(f"\n[*] Desplegando Lambda {name}...")
+def upload_lambda_package(code_key, zip_content):
+    """Sube el paquete Lambda a S3 (la clave incluye el hash del código)."""
+    s3_client().put_object(Bucket=BUCKET_UPLOADS, Key=code_key, Body=zip_content)
+
+def create_lambda(name, source_dir, role_arn, handler, timeout=30, memory=256, environment=None, zip_content=None):
+    """Crea o actualiza una función Lambda (usa zip_content si ya viene empaquetado)."""
+    log(f"\n[*] Desplegando Lambda {name}...")
     
-    # Crear ZIP en directorio temporal del sistema
-    temp_dir = tempfile.gettempdir()
-    zip_path = Path(temp_dir) / f"{name}.zip"
-    zip_lambda(source_dir, zip_path)
+    # Crear ZIP en memoria (sin archivos temporales compartidos entre despliegues concurrentes)
+    if zip_content is None:
+        zip_content = build_lambda_zip(source_dir)
     
-    with open(zip_path, "rb") as f:
-        zip_content = f.read()
+    code_digest = hashlib.sha256(zip_content).digest()
+    code_sha256 = base64.b64encode(code_digest).decode()
+    code_key = f"{LAMBDA_PACKAGES_PREFIX}{name}-{code_digest.hex()}.zip"
     
-    try:
-        # Intentar crear
-        response = lambda_client.create_function(
+    def create_function(role):
+        return lambda_client().create_function(
             FunctionName=name,
             Runtime="python3.11",
-            Role=role_arn,
+            Role=role,
             Handler=handler,
-            Code={"ZipFile": zip_content},
+            Code={"S3Bucket": BUCKET_UPLOADS, "S3Key": code_key},
             Timeout=timeout,
             MemorySize=memory,
             Environment={"Variables": environment or {}}
         )
-        print(f"    ✓ Lambda {name} creada")
-        return response["FunctionArn"]
+    
+    # Comprobar si la función ya existe (solo se sube el paquete si va a usarse)
+    try:
+        lambda_client().get_function_configuration(FunctionName=name)
+        function_exists = True
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ResourceConflictException":
-            # Función existe, esperar a que termine actualizaciones previas
-            print(f"    ℹ Lambda {name} ya existe, esperando a que esté lista...")
-            
-            # Esperar hasta 60 segundos a que la función esté activa
-            for attempt in range(12):
-                try:
-                    response = lambda_client.get_function(FunctionName=name)
-                    state = response["Configuration"]["State"]
-                    if state == "Active":
-                        break
-                    print(f"    ⏳ Estado: {state}, esperando...")
-                    time.sleep(5)
-                except:
-                    time.sleep(5)
-            
-            # Actualizar código
-            try:
-                lambda_client.update_function_code(
-                    FunctionName=name,
-                    ZipFile=zip_content
-                )
-                print(f"    ✓ Código actualizado")
-                
-                # Esperar a que termine la actualización del código
-                time.sleep(3)
-                
-                # Actualizar configuración
-                lambda_client.update_function_configuration(
-                    FunctionName=name,
-                    Timeout=timeout,
-                    MemorySize=memory,
-                    Environment={"Variables": environment or {}}
-                )
-                print(f"    ✓ Lambda {name} actualizada")
-            except ClientError as update_error:
-                if "ResourceConflictException" in str(update_error):
-                    print(f"    ℹ Lambda en actualización, usando versión existente")
-                else:
-                    raise
-            
-            response = lambda_client.get_function(FunctionName=name)
-            return response["Configuration"]["FunctionArn"]
-        else:
+        if e.response["Error"]["Code"] != "ResourceNotFoundException":
             raise
+        function_exists = False
+    
+    if not function_exists:
+        # Crear
+        upload_lambda_package(code_key, zip_content)
+        try:
+            response = create_function(role_arn)
+        except ClientError as e:
+            # El ARN derivado de LabRole no es válido en esta cuenta: resolverlo en IAM
+            error = e.response["Error"]
+            if error["Code"] == "InvalidParameterValueException" and "role" in error.get("Message", "").lower():
+                log(f"    ⚠ Rol {role_arn} no válido, resolviendo rol en IAM...")
+                response = create_function(resolve_iam_role())
+            else:
+                raise
+        log(f"    ✓ Lambda {name} creada")
+        return response["FunctionArn"]
+    
+    # Función existe, esperar a que termine actualizaciones previas
+    log(f"    ℹ Lambda {name} ya existe, esperando a que esté lista...")
+    
+    # Esperar a que la función esté activa y sin actualizaciones en curso
+    # (function_active_v2 solo mira State; function_updated_v2 mira LastUpdateStatus)
+    lambda_client().get_waiter("function_active_v2").wait(FunctionName=name)
+    lambda_client().get_waiter("function_updated_v2").wait(
+        FunctionName=name,
+        WaiterConfig={"Delay": 1, "MaxAttempts": 30}
+    )
+    current_config = lambda_client().get_function_configuration(FunctionName=name)
+    
+    # Comparar con lo desplegado para solo tocar lo que haya cambiado
+    variables = environment or {}
+    code_changed = current_config.get("CodeSha256") != code_sha256
+    config_changed = (
+        current_config.get("Timeout") != timeout
+        or current_config.get("MemorySize") != memory
+        or current_config.get("Environment", {}).get("Variables", {}) != variables
+    )
+    
+    # Actualizar código
+    if code_changed:
+        upload_lambda_package(code_key, zip_content)
+        lambda_client().update_function_code(
+            FunctionName=name,
+            S3Bucket=BUCKET_UPLOADS,
+            S3Key=code_key
+        )
+        log(f"    ✓ Código actualizado")
+        
+        # Esperar a que termine la actualización del código (LastUpdateStatus = Successful)
+        lambda_client().get_waiter("function_updated_v2").wait(
+            FunctionName=name,
+            WaiterConfig={"Delay": 1, "MaxAttempts": 30}
+        )
+    else:
+        log(f"    ℹ Código sin cambios, se omite la actualización")
+    
+    # Actualizar configuración
+    if config_changed:
+        lambda_client().update_function_configuration(
+            FunctionName=name,
+            Timeout=timeout,
+            MemorySize=memory,
+            Environment={"Variables": variables}
+        )
+        log(f"    ✓ Lambda {name} actualizada")
+    else:
+        log(f"    ℹ Configuración sin cambios")
+    
+    return current_config["FunctionArn"]
 
 # ===== SNS =====
 def create_sns_topic():
@@ -302,52 +505,59 @@ def create_sns_topic():
     
     Siempre usa 'low-stock-inventory-main' como nombre para evitar duplicados.
     """
-    print("\n[*] Verificando tema SNS...")
-    
-    # El nombre del tema debe ser fijo (sin sufijo) para evitar crear múltiples temas
-    fixed_topic_name = "low-stock-inventory-main"
-    
-    # 1. Intentar buscar el tema por nombre fijo
-    try:
-        response = sns_client.list_topics()
-        for topic in response["Topics"]:
-            if fixed_topic_name in topic["TopicArn"]:
-                print(f"    ✓ Tema SNS {fixed_topic_name} encontrado (reutilizando)")
-                print(f"    ℹ ARN: {topic['TopicArn']}")
-                return topic["TopicArn"]
-    except ClientError:
-        pass
-    
-    # 2. Si no existe, crear nuevo con nombre fijo
+    log("\n[*] Verificando tema SNS...")
+    
+    # Solo reutilizar el ARN si es de esta cuenta y región (arn:aws:sns:<región>:<cuenta>:<nombre>)
+    cached_arn = cached("sns_topic_arn")
+    if cached_arn:
+        arn_parts = cached_arn.split(":")
+        if len(arn_parts) == 6 and arn_parts[3] == REGION and arn_parts[4] == account_id():
+            log(f"    ✓ Tema SNS registrado en deployment.json (reutilizando)")
+            log(f"    ℹ ARN: {cached_arn}")
+            return cached_arn
+    
+    # El nombre del tema debe ser fijo (sin sufijo) para evitar crear múltiples temas.
+    # CreateTopic es idempotente: si ya existe devuelve el ARN del tema existente.
     try:
-        response = sns_client.create_topic(Name=fixed_topic_name)
+        response = sns_client().create_topic(Name=SNS_TOPIC_NAME)
         topic_arn = response["TopicArn"]
-        print(f"    ✓ Tema SNS {fixed_topic_name} creado")
-        print(f"    ℹ ARN: {topic_arn}")
+        log(f"    ✓ Tema SNS {SNS_TOPIC_NAME} listo")
+        log(f"    ℹ ARN: {topic_arn}")
         return topic_arn
     except ClientError as e:
-        print(f"    ✗ Error al crear tema SNS: {e}")
+        log(f"    ✗ Error al crear tema SNS: {e}")
         raise
 
 # ===== API Gateway =====
 def create_api_gateway(lambda_api_arn):
     """Crea HTTP API Gateway con CORS habilitado."""
-    print("\n[*] Creando API Gateway...")
+    log("\n[*] Creando API Gateway...")
     
     api_name = f"inventory-api-{SUFFIX}"
     
-    # Buscar APIs existentes con el mismo nombre y eliminarlas
-    try:
-        existing_apis = apigateway_client.get_apis()
-        for api in existing_apis.get("Items", []):
-            if api["Name"] == api_name:
-                print(f"    ℹ Eliminando API existente {api['ApiId']}...")
-                apigateway_client.delete_api(ApiId=api["ApiId"])
-    except:
-        pass
+    # Eliminar la API del despliegue anterior: directamente si está registrada en
+    # deployment.json, o buscando APIs existentes con el mismo nombre
+    cached_api_id = cached("api_id")
+    if cached_api_id:
+        try:
+            log(f"    ℹ Eliminando API existente {cached_api_id}...")
+            apigateway_client().delete_api(ApiId=cached_api_id)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NotFoundException":
+                log(f"    ⚠ No se pudo eliminar la API anterior: {e}")
+    else:
+        try:
+            paginator = apigateway_client().get_paginator("get_apis")
+            for page in paginator.paginate():
+                for api in page.get("Items", []):
+                    if api["Name"] == api_name:
+                        log(f"    ℹ Eliminando API existente {api['ApiId']}...")
+                        apigateway_client().delete_api(ApiId=api["ApiId"])
+        except:
+            pass
     
     # Crear API
-    response = apigateway_client.create_api(
+    response = apigateway_client().create_api(
         Name=api_name,
         ProtocolType="HTTP",
         CorsConfiguration={
@@ -358,10 +568,10 @@ def create_api_gateway(lambda_api_arn):
         }
     )
     api_id = response["ApiId"]
-    print(f"    ✓ API Gateway {api_name} creada")
+    log(f"    ✓ API Gateway {api_name} creada")
     
     # Crear integración Lambda
-    integration_response = apigateway_client.create_integration(
+    integration_response = apigateway_client().create_integration(
         ApiId=api_id,
         IntegrationType="AWS_PROXY",
         IntegrationMethod="POST",
@@ -376,47 +586,51 @@ def create_api_gateway(lambda_api_arn):
         {"RouteKey": "GET /items/{store}", "Target": f"integrations/{integration_id}"}
     ]
     
-    for route in routes:
-        apigateway_client.create_route(
+    def create_route(route):
+        apigateway_client().create_route(
             ApiId=api_id,
             RouteKey=route["RouteKey"],
             Target=route["Target"]
         )
-        print(f"    ✓ Ruta {route['RouteKey']} creada")
+        return route["RouteKey"]
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for route_key in executor.map(create_route, routes):
+            log(f"    ✓ Ruta {route_key} creada")
     
     # Dar permiso a API Gateway para invocar Lambda
     try:
-        lambda_client.add_permission(
+        lambda_client().add_permission(
             FunctionName=LAMBDA_API_NAME,
             StatementId=f"AllowApiGateway-{api_id}",
             Action="lambda:InvokeFunction",
             Principal="apigateway.amazonaws.com",
-            SourceArn=f"arn:aws:execute-api:{REGION}:{ACCOUNT_ID}:{api_id}/*/*"
+            SourceArn=f"arn:aws:execute-api:{REGION}:{account_id()}:{api_id}/*/*"
         )
     except ClientError as e:
         if "ResourceConflictException" not in str(e):
             raise
     
     # Crear stage
-    stage_response = apigateway_client.create_stage(
+    stage_response = apigateway_client().create_stage(
         ApiId=api_id,
         StageName="prod",
         AutoDeploy=True
     )
     
     api_endpoint = f"https://{api_id}.execute-api.{REGION}.amazonaws.com/prod"
-    print(f"    ✓ Endpoint: {api_endpoint}")
+    log(f"    ✓ Endpoint: {api_endpoint}")
     
     return api_id, api_endpoint
 
 # ===== S3 Event Trigger =====
 def add_s3_trigger_to_lambda(lambda_name):
     """Agrega trigger de S3 PutObject a Lambda."""
-    print(f"\n[*] Agregando trigger S3 a {lambda_name}...")
+    log(f"\n[*] Agregando trigger S3 a {lambda_name}...")
     
     # Dar permiso a S3 para invocar Lambda
     try:
-        lambda_client.add_permission(
+        lambda_client().add_permission(
             FunctionName=lambda_name,
             StatementId=f"AllowS3-{BUCKET_UPLOADS}",
             Action="lambda:InvokeFunction",
@@ -428,133 +642,145 @@ def add_s3_trigger_to_lambda(lambda_name):
             raise
     
     # Configurar notificación en S3
-    lambda_arn = lambda_client.get_function(FunctionName=lambda_name)["Configuration"]["FunctionArn"]
+    lambda_arn = lambda_client().get_function(FunctionName=lambda_name)["Configuration"]["FunctionArn"]
     
     try:
-        s3_client.put_bucket_notification_configuration(
+        s3_client().put_bucket_notification_configuration(
             Bucket=BUCKET_UPLOADS,
             NotificationConfiguration={
                 "LambdaFunctionConfigurations": [
                     {
                         "LambdaFunctionArn": lambda_arn,
+                        # Sin filtro de sufijo (acepta *.csv y *.CSV); load_inventory ignora _deploy/
                         "Events": ["s3:ObjectCreated:*"]
                     }
                 ]
             }
         )
-        print(f"    ✓ Trigger S3 configurado")
+        log(f"    ✓ Trigger S3 configurado")
     except ClientError as e:
-        print(f"    ⚠ Error configurando trigger: {e}")
+        log(f"    ⚠ Error configurando trigger: {e}")
 
 # ===== DynamoDB Streams =====
 def add_stream_trigger_to_lambda(lambda_name):
     """Agrega DynamoDB Stream como source para Lambda notify."""
-    print(f"\n[*] Agregando DynamoDB Stream a {lambda_name}...")
+    log(f"\n[*] Agregando DynamoDB Stream a {lambda_name}...")
     
     # Obtener ARN del stream
-    table_response = dynamodb_client.describe_table(TableName=TABLE_NAME)
+    table_response = dynamodb_client().describe_table(TableName=TABLE_NAME)
     stream_arn = table_response["Table"]["LatestStreamArn"]
     
     if not stream_arn:
-        print("    ⚠ Stream no habilitado en tabla")
+        log("    ⚠ Stream no habilitado en tabla")
         return
     
     # Primero, eliminar event source mappings anteriores si existen
     try:
-        existing_mappings = lambda_client.list_event_source_mappings(
+        existing_mappings = lambda_client().list_event_source_mappings(
             FunctionName=lambda_name,
             EventSourceArn=stream_arn
         )
-        for mapping in existing_mappings.get("EventSourceMappings", []):
-            print(f"    ℹ Eliminando event source mapping anterior: {mapping['UUID']}")
-            lambda_client.delete_event_source_mapping(UUID=mapping["UUID"])
+        mappings = existing_mappings.get("EventSourceMappings", [])
+        for mapping in mappings:
+            log(f"    ℹ Eliminando event source mapping anterior: {mapping['UUID']}")
+        
+        # Los borrados son independientes entre sí: lanzarlos en paralelo
+        if mappings:
+            with ThreadPoolExecutor(max_workers=len(mappings)) as executor:
+                list(executor.map(
+                    lambda mapping: lambda_client().delete_event_source_mapping(UUID=mapping["UUID"]),
+                    mappings
+                ))
     except ClientError:
         pass
     
     # Crear event source mapping con TRIM_HORIZON para procesar eventos desde el inicio
     try:
-        response = lambda_client.create_event_source_mapping(
+        response = lambda_client().create_event_source_mapping(
             EventSourceArn=stream_arn,
             FunctionName=lambda_name,
             Enabled=True,
             BatchSize=100,
             StartingPosition="TRIM_HORIZON"
         )
-        print(f"    ✓ Event source mapping creado: {response['UUID']}")
-        print(f"    ℹ Procesará eventos desde el inicio del stream (TRIM_HORIZON)")
+        log(f"    ✓ Event source mapping creado: {response['UUID']}")
+        log(f"    ℹ Procesará eventos desde el inicio del stream (TRIM_HORIZON)")
     except ClientError as e:
         if "ResourceConflictException" in str(e):
-            print(f"    ℹ Event source mapping podría ya existir")
+            log(f"    ℹ Event source mapping podría ya existir")
         else:
-            print(f"    ⚠ Error: {e}")
+            log(f"    ⚠ Error: {e}")
 
 # ===== Upload Web =====
+def prepare_web_file(file_path, s3_key, api_endpoint):
+    """Devuelve (key, contenido, content-type) de un archivo web listo para subir."""
+    # Leer contenido
+    with open(file_path, "rb") as f:
+        content = f.read()
+    
+    extension = os.path.splitext(file_path)[1].lower()
+    
+    # Si es HTML, reemplazar el endpoint de la API
+    if extension == ".html":
+        try:
+            content_text = content.decode("utf-8")
+            content_text = content_text.replace("REPLACE_WITH_API_ENDPOINT", api_endpoint)
+            content = content_text.encode("utf-8")
+        except:
+            pass  # Si no es texto, mantener como está
+    
+    # Determinar Content-Type
+    content_type = CONTENT_TYPES.get(
+        extension,
+        mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    )
+    
+    return s3_key, content, content_type
+
+def upload_web_file(file_to_upload):
+    """Sube un archivo (key, contenido, content-type) al bucket web S3."""
+    s3_key, content, content_type = file_to_upload
+    s3_client().put_object(
+        Bucket=BUCKET_WEB,
+        Key=s3_key,
+        Body=content,
+        ContentType=content_type
+    )
+    return s3_key
+
 def upload_web_content(api_endpoint):
     """Sube contenido web al bucket web S3 (carpeta website/)."""
-    print("\n[*] Subiendo contenido web a S3...")
+    log("\n[*] Subiendo contenido web a S3...")
     
     web_dir = PROJECT_ROOT / "website"
     
     if not web_dir.exists():
-        print(f"    ⚠ Carpeta website no encontrada en {web_dir}")
-        return None
-    
-    # Subir todos los archivos recursivamente
-    files_uploaded = 0
-    for file_path in web_dir.rglob("*"):
-        if file_path.is_file():
-            # Calcular la clave S3 relativa
-            relative_path = file_path.relative_to(web_dir)
-            s3_key = str(relative_path).replace("\\", "/")
-            
-            # Leer contenido
-            with open(file_path, "rb") as f:
-                content = f.read()
-            
-            # Si es HTML, reemplazar el endpoint de la API
-            if file_path.suffix == ".html":
-                try:
-                    content_text = content.decode("utf-8")
-                    content_text = content_text.replace("REPLACE_WITH_API_ENDPOINT", api_endpoint)
-                    content = content_text.encode("utf-8")
-                except:
-                    pass  # Si no es texto, mantener como está
-            
-            # Determinar Content-Type
-            content_type = "application/octet-stream"
-            if file_path.suffix == ".html":
-                content_type = "text/html"
-            elif file_path.suffix == ".css":
-                content_type = "text/css"
-            elif file_path.suffix == ".js":
-                content_type = "application/javascript"
-            elif file_path.suffix in [".jpg", ".jpeg"]:
-                content_type = "image/jpeg"
-            elif file_path.suffix == ".png":
-                content_type = "image/png"
-            elif file_path.suffix == ".gif":
-                content_type = "image/gif"
-            elif file_path.suffix == ".svg":
-                content_type = "image/svg+xml"
-            
-            # Subir a S3
-            s3_client.put_object(
-                Bucket=BUCKET_WEB,
-                Key=s3_key,
-                Body=content,
-                ContentType=content_type
-            )
-            files_uploaded += 1
-            print(f"    ✓ {s3_key}")
+        log(f"    ⚠ Carpeta website no encontrada en {web_dir}")
+        return
     
-    print(f"    ✓ Total archivos subidos: {files_uploaded}")
+    # Preparar todos los archivos recursivamente
+    files_to_upload = [
+        prepare_web_file(file_path, s3_key, api_endpoint)
+        for file_path, s3_key in iter_files(web_dir)
+    ]
+    
+    # Subir a S3 en paralelo (cada PUT es independiente)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        uploaded_keys = list(executor.map(upload_web_file, files_to_upload))
+    files_uploaded = len(uploaded_keys)
+    
+    log(f"    ✓ Total archivos subidos: {files_uploaded}")
+
+def configure_web_hosting():
+    """Configura el bucket web como sitio estático público (no depende de la API)."""
+    log("\n[*] Configurando hosting estático en S3...")
     
     # Habilitar hosting estático
     website_config = {
         "IndexDocument": {"Suffix": "index.html"},
         "ErrorDocument": {"Key": "index.html"}
     }
-    s3_client.put_bucket_website(
+    s3_client().put_bucket_website(
         Bucket=BUCKET_WEB,
         WebsiteConfiguration=website_config
     )
@@ -564,7 +790,7 @@ def upload_web_content(api_endpoint):
     
     # Desactivar Block Public Access
     try:
-        s3_client.put_public_access_block(
+        s3_client().put_public_access_block(
             Bucket=BUCKET_WEB,
             PublicAccessBlockConfiguration={
                 'BlockPublicAcls': False,
@@ -573,9 +799,9 @@ def upload_web_content(api_endpoint):
                 'RestrictPublicBuckets': False
             }
         )
-        print(f"    ✓ Block Public Access desactivado")
+        log(f"    ✓ Block Public Access desactivado")
     except ClientError as e:
-        print(f"    ⚠ No se pudo desactivar Block Public Access: {e}")
+        log(f"    ⚠ No se pudo desactivar Block Public Access: {e}")
     
     # Intentar hacer bucket público
     try:
@@ -590,16 +816,16 @@ def upload_web_content(api_endpoint):
                 }
             ]
         }
-        s3_client.put_bucket_policy(
+        s3_client().put_bucket_policy(
             Bucket=BUCKET_WEB,
             Policy=json.dumps(bucket_policy)
         )
-        print(f"    ✓ Sitio web público: {web_url}")
+        log(f"    ✓ Sitio web público: {web_url}")
     except ClientError as e:
         if "BlockPublicPolicy" in str(e) or "AccessDenied" in str(e):
-            print(f"    ⚠ No se puede hacer el bucket público")
-            print(f"    ℹ URL (no accesible públicamente): {web_url}")
-            print(f"    ℹ Usa la API REST para acceder a los datos")
+            log(f"    ⚠ No se puede hacer el bucket público")
+            log(f"    ℹ URL (no accesible públicamente): {web_url}")
+            log(f"    ℹ Usa la API REST para acceder a los datos")
         else:
             raise
     
@@ -615,73 +841,107 @@ def main():
     print(f"Suffix: {SUFFIX}")
     
     try:
-        # 1. Crear buckets S3
-        create_s3_buckets()
-        
-        # 2. Crear tabla DynamoDB
-        table_arn = create_dynamodb_table()
-        
-        # 3. Crear rol IAM
-        role_arn = create_iam_role()
-        
-        # 4. Crear tema SNS
-        topic_arn = create_sns_topic()
-        
-        # 5. Desplegar Lambdas
-        lambda_load_arn = create_lambda(
-            LAMBDA_LOAD_NAME,
-            PROJECT_ROOT / "lambdas" / "load_inventory",
-            role_arn,
-            "lambda_function.lambda_handler",
-            timeout=60,
-            memory=512,
-            environment={
-                "TABLE_NAME": TABLE_NAME,
-                "REGION": REGION
-            }
-        )
-        
-        lambda_api_arn = create_lambda(
-            LAMBDA_API_NAME,
-            PROJECT_ROOT / "lambdas" / "get_inventory_api",
-            role_arn,
-            "lambda_function.lambda_handler",
-            timeout=30,
-            memory=256,
-            environment={
-                "TABLE_NAME": TABLE_NAME,
-                "REGION": REGION
+        # Cada tarea (run_task) imprime su salida en bloque al terminar, sin mezclarse con las demás
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # 1-4. Recursos base independientes entre sí (S3, DynamoDB, IAM, SNS)
+            buckets_future = executor.submit(run_task, create_s3_buckets)
+            table_future = executor.submit(run_task, create_dynamodb_table)
+            role_future = executor.submit(run_task, create_iam_role)
+            topic_future = executor.submit(run_task, create_sns_topic)
+            
+            # Empaquetar las Lambdas mientras tanto (trabajo local, fuera de la ruta crítica de red)
+            lambda_dirs = {
+                LAMBDA_LOAD_NAME: PROJECT_ROOT / "lambdas" / "load_inventory",
+                LAMBDA_API_NAME: PROJECT_ROOT / "lambdas" / "get_inventory_api",
+                LAMBDA_NOTIFY_NAME: PROJECT_ROOT / "lambdas" / "notify_low_stock"
             }
-        )
-        
-        lambda_notify_arn = create_lambda(
-            LAMBDA_NOTIFY_NAME,
-            PROJECT_ROOT / "lambdas" / "notify_low_stock",
-            role_arn,
-            "lambda_function.lambda_handler",
-            timeout=60,
-            memory=256,
-            environment={
-                "TABLE_NAME": TABLE_NAME,
-                "TOPIC_ARN": topic_arn,
-                "REGION": REGION
+            zip_futures = {
+                name: executor.submit(build_lambda_zip, source_dir)
+                for name, source_dir in lambda_dirs.items()
             }
-        )
-        
-        # 6. Configurar triggers
-        add_s3_trigger_to_lambda(LAMBDA_LOAD_NAME)
-        add_stream_trigger_to_lambda(LAMBDA_NOTIFY_NAME)
-        
-        # 7. Crear API Gateway
-        api_id, api_endpoint = create_api_gateway(lambda_api_arn)
+            
+            versioning_enabled = buckets_future.result()
+            table_arn = table_future.result()
+            role_arn = role_future.result()
+            topic_arn = topic_future.result()
+            
+            # Caducidad de los paquetes Lambda (solo necesita el bucket; en paralelo con la ola 5)
+            lifecycle_future = executor.submit(run_task, configure_packages_lifecycle)
+            
+            # 5. Desplegar Lambdas (dependen del rol IAM y del tema SNS)
+            lambda_load_future = executor.submit(
+                run_task,
+                create_lambda,
+                LAMBDA_LOAD_NAME,
+                lambda_dirs[LAMBDA_LOAD_NAME],
+                role_arn,
+                "lambda_function.lambda_handler",
+                timeout=60,
+                memory=512,
+                environment={
+                    "TABLE_NAME": TABLE_NAME,
+                    "REGION": REGION
+                },
+                zip_content=zip_futures[LAMBDA_LOAD_NAME].result()
+            )
+            
+            lambda_api_future = executor.submit(
+                run_task,
+                create_lambda,
+                LAMBDA_API_NAME,
+                lambda_dirs[LAMBDA_API_NAME],
+                role_arn,
+                "lambda_function.lambda_handler",
+                timeout=30,
+                memory=256,
+                environment={
+                    "TABLE_NAME": TABLE_NAME,
+                    "REGION": REGION
+                },
+                zip_content=zip_futures[LAMBDA_API_NAME].result()
+            )
+            
+            lambda_notify_future = executor.submit(
+                run_task,
+                create_lambda,
+                LAMBDA_NOTIFY_NAME,
+                lambda_dirs[LAMBDA_NOTIFY_NAME],
+                role_arn,
+                "lambda_function.lambda_handler",
+                timeout=60,
+                memory=256,
+                environment={
+                    "TABLE_NAME": TABLE_NAME,
+                    "TOPIC_ARN": topic_arn,
+                    "REGION": REGION
+                },
+                zip_content=zip_futures[LAMBDA_NOTIFY_NAME].result()
+            )
+            
+            lambda_load_arn = lambda_load_future.result()
+            lambda_api_arn = lambda_api_future.result()
+            lambda_notify_arn = lambda_notify_future.result()
+            
+            # 6-7. Configurar triggers y crear API Gateway
+            s3_trigger_future = executor.submit(run_task, add_s3_trigger_to_lambda, LAMBDA_LOAD_NAME)
+            stream_trigger_future = executor.submit(run_task, add_stream_trigger_to_lambda, LAMBDA_NOTIFY_NAME)
+            api_future = executor.submit(run_task, create_api_gateway, lambda_api_arn)
+            web_hosting_future = executor.submit(run_task, configure_web_hosting)
+            
+            lifecycle_future.result()
+            s3_trigger_future.result()
+            stream_trigger_future.result()
+            api_id, api_endpoint = api_future.result()
+            web_url = web_hosting_future.result()
         
         # 8. Subir contenido web
-        web_url = upload_web_content(api_endpoint)
+        upload_web_content(api_endpoint)
         
         # 9. Guardar configuración
         config = {
             "deployment_time": datetime.now().isoformat(),
             "region": REGION,
+            "account_id": account_id(),
             "suffix": SUFFIX,
             "bucket_uploads": BUCKET_UPLOADS,
             "bucket_web": BUCKET_WEB,
@@ -693,7 +953,8 @@ def main():
             "api_endpoint": api_endpoint,
             "web_url": web_url,
             "sns_topic_arn": topic_arn,
-            "iam_role": IAM_ROLE_LAMBDA
+            "iam_role": IAM_ROLE_LAMBDA,
+            "versioning_enabled": versioning_enabled
         }
         
         config_file = PROJECT_ROOT / "infra" / "deployment.json"
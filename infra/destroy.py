@@ -5,18 +5,30 @@ Script para eliminar todos los recursos creados durante el despliegue.
 
 import json
 import os
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 REGION = os.getenv("AWS_REGION", "us-east-1")
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Con --cleanup-orphans también se buscan y eliminan temas 'low-stock' de despliegues anteriores
+CLEANUP_ORPHANS = "--cleanup-orphans" in sys.argv
+
+# Vaciado de buckets: listados y borrados en paralelo
+S3_LIST_WORKERS = 8
+S3_DELETE_WORKERS = 8
+S3_DELETE_QUEUE_SIZE = 16  # Lotes pendientes como máximo (acota la memoria)
+
 print(f"[*] Región: {REGION}")
 
-# Clientes de AWS
-s3_client = boto3.client("s3", region_name=REGION)
+# Clientes de AWS (S3 con pool amplio para los listados y borrados concurrentes)
+s3_client = boto3.client("s3", region_name=REGION, config=Config(max_pool_connections=50))
 dynamodb_client = boto3.client("dynamodb", region_name=REGION)
 lambda_client = boto3.client("lambda", region_name=REGION)
 iam_client = boto3.client("iam", region_name=REGION)
@@ -43,79 +55,131 @@ API_ID = config["api_id"]
 IAM_ROLE = config["iam_role"]
 TOPIC_ARN = config["sns_topic_arn"]
 
+# Salida por hilo: cada tarea concurrente acumula sus líneas y se imprimen juntas al terminar
+output = threading.local()
+print_lock = threading.Lock()
+
+def log(message=""):
+    """Imprime el mensaje o, si el hilo está capturando salida, lo acumula."""
+    lines = getattr(output, "lines", None)
+    if lines is None:
+        print(message)
+    else:
+        lines.append(message)
+
+def run_task(task, *args, **kwargs):
+    """Ejecuta una tarea capturando su salida y la imprime en bloque al terminar (aunque falle)."""
+    output.lines = []
+    try:
+        return task(*args, **kwargs)
+    finally:
+        lines, output.lines = output.lines, None
+        with print_lock:
+            for line in lines:
+                print(line)
+
+def enqueue_version_batches(bucket_name, batches, prefix="", delimiter=None):
+    """
+    Lista las versiones y delete markers bajo un prefijo y encola lotes de
+    hasta 1000 para borrar. Devuelve los prefijos comunes (si se usa delimiter).
+    """
+    paginator = s3_client.get_paginator("list_object_versions")
+    params = {"Bucket": bucket_name, "Prefix": prefix}
+    if delimiter:
+        params["Delimiter"] = delimiter
+    
+    prefixes = []
+    batch = []
+    for page in paginator.paginate(**params):
+        prefixes.extend(common["Prefix"] for common in page.get("CommonPrefixes", []))
+        for version in page.get("Versions", []) + page.get("DeleteMarkers", []):
+            batch.append({
+                "Key": version["Key"],
+                "VersionId": version["VersionId"]
+            })
+            if len(batch) == 1000:
+                batches.put(batch)
+                batch = []
+    
+    if batch:
+        batches.put(batch)
+    return prefixes
+
 def empty_s3_bucket(bucket_name):
     """Vacía completamente un bucket S3, incluidas todas las versiones."""
-    print(f"\n[*] Vaciando bucket S3: {bucket_name}...")
+    log(f"\n[*] Vaciando bucket S3: {bucket_name}...")
     try:
-        # Primero, desactivar versionado para facilitar la eliminación
-        try:
-            s3_client.put_bucket_versioning(
-                Bucket=bucket_name,
-                VersioningConfiguration={"Status": "Suspended"}
-            )
-            print(f"    ✓ Versionado suspendido en {bucket_name}")
-        except:
-            pass
-        
-        # Eliminar todas las versiones de objetos
-        paginator = s3_client.get_paginator("list_object_versions")
-        pages = paginator.paginate(Bucket=bucket_name)
+        # Productor/consumidor: varios listados en paralelo (uno por prefijo de primer
+        # nivel) encolan lotes en una cola acotada mientras los workers los borran.
+        # No hace falta suspender el versionado: se borra por VersionId explícito.
+        batches = queue.Queue(maxsize=S3_DELETE_QUEUE_SIZE)
+        delete_errors = []
         
-        delete_markers = []
-        objects_to_delete = []
+        def delete_worker():
+            deleted = 0
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return deleted
+                try:
+                    response = s3_client.delete_objects(
+                        Bucket=bucket_name,
+                        Delete={"Objects": batch}
+                    )
+                    deleted += len(response.get("Deleted", []))
+                except Exception as e:
+                    # Seguir consumiendo para no bloquear a los listados
+                    delete_errors.append(e)
         
-        for page in pages:
-            # Eliminar versiones de objetos
-            if "Versions" in page:
-                for version in page["Versions"]:
-                    objects_to_delete.append({
-                        "Key": version["Key"],
-                        "VersionId": version["VersionId"]
-                    })
-            
-            # Eliminar delete markers
-            if "DeleteMarkers" in page:
-                for marker in page["DeleteMarkers"]:
-                    delete_markers.append({
-                        "Key": marker["Key"],
-                        "VersionId": marker["VersionId"]
-                    })
+        with ThreadPoolExecutor(max_workers=S3_DELETE_WORKERS) as delete_executor:
+            workers = [delete_executor.submit(delete_worker) for _ in range(S3_DELETE_WORKERS)]
+            try:
+                # La raíz se lista con delimitador: devuelve sus objetos y los prefijos de primer nivel
+                prefixes = enqueue_version_batches(bucket_name, batches, delimiter="/")
+                if prefixes:
+                    with ThreadPoolExecutor(max_workers=S3_LIST_WORKERS) as list_executor:
+                        list(list_executor.map(
+                            lambda prefix: enqueue_version_batches(bucket_name, batches, prefix=prefix),
+                            prefixes
+                        ))
+            finally:
+                for _ in workers:
+                    batches.put(None)
+            deleted_count = sum(worker.result() for worker in workers)
         
-        # Realizar eliminaciones en lotes (max 1000 por solicitud)
-        all_deletes = objects_to_delete + delete_markers
-        for i in range(0, len(all_deletes), 1000):
-            batch = all_deletes[i:i+1000]
-            if batch:
-                s3_client.delete_objects(
-                    Bucket=bucket_name,
-                    Delete={"Objects": batch}
-                )
+        if delete_errors:
+            raise delete_errors[0]
         
-        print(f"    ✓ Bucket {bucket_name} vaciado ({len(all_deletes)} objetos eliminados)")
+        log(f"    ✓ Bucket {bucket_name} vaciado ({deleted_count} objetos eliminados)")
     
     except ClientError as e:
         if e.response["Error"]["Code"] == "NoSuchBucket":
-            print(f"    ℹ Bucket {bucket_name} no existe")
+            log(f"    ℹ Bucket {bucket_name} no existe")
         else:
-            print(f"    ⚠ Error vaciando bucket (intentando continuar): {e}")
+            log(f"    ⚠ Error vaciando bucket (intentando continuar): {e}")
     except Exception as e:
-        print(f"    ⚠ Error vaciando bucket (intentando continuar): {e}")
+        log(f"    ⚠ Error vaciando bucket (intentando continuar): {e}")
 
 def delete_s3_bucket(bucket_name):
     """Elimina un bucket S3 vacío."""
-    print(f"\n[*] Eliminando bucket S3: {bucket_name}...")
+    log(f"\n[*] Eliminando bucket S3: {bucket_name}...")
     try:
         s3_client.delete_bucket(Bucket=bucket_name)
-        print(f"    ✓ Bucket {bucket_name} eliminado")
+        log(f"    ✓ Bucket {bucket_name} eliminado")
     except ClientError as e:
         if e.response["Error"]["Code"] == "NoSuchBucket":
-            print(f"    ℹ Bucket {bucket_name} no existe")
+            log(f"    ℹ Bucket {bucket_name} no existe")
         else:
-            print(f"    ⚠ Error eliminando bucket (continuando...): {e}")
+            log(f"    ⚠ Error eliminando bucket (continuando...): {e}")
+
+def empty_and_delete_s3_bucket(bucket_name):
+    """Vacía y elimina un bucket S3."""
+    empty_s3_bucket(bucket_name)
+    delete_s3_bucket(bucket_name)
 
 def delete_lambda(function_name):
     """Elimina una función Lambda."""
-    print(f"\n[*] Eliminando Lambda: {function_name}...")
+    log(f"\n[*] Eliminando Lambda: {function_name}...")
     try:
         # Primero eliminar event source mappings (para DynamoDB Streams)
         try:
@@ -126,50 +190,50 @@ def delete_lambda(function_name):
                 lambda_client.delete_event_source_mapping(
                     UUID=mapping["UUID"]
                 )
-                print(f"    ✓ Event source mapping eliminado")
+                log(f"    ✓ Event source mapping eliminado")
         except:
             pass
         
         lambda_client.delete_function(FunctionName=function_name)
-        print(f"    ✓ Lambda {function_name} eliminada")
+        log(f"    ✓ Lambda {function_name} eliminada")
     except ClientError as e:
         if e.response["Error"]["Code"] == "ResourceNotFoundException":
-            print(f"    ℹ Lambda {function_name} no existe")
+            log(f"    ℹ Lambda {function_name} no existe")
         else:
-            print(f"    ✗ Error: {e}")
+            log(f"    ✗ Error: {e}")
 
 def delete_api_gateway(api_id):
     """Elimina API Gateway."""
-    print(f"\n[*] Eliminando API Gateway: {api_id}...")
+    log(f"\n[*] Eliminando API Gateway: {api_id}...")
     try:
         apigateway_client.delete_api(ApiId=api_id)
-        print(f"    ✓ API Gateway {api_id} eliminada")
+        log(f"    ✓ API Gateway {api_id} eliminada")
     except ClientError as e:
         if e.response["Error"]["Code"] == "NotFoundException":
-            print(f"    ℹ API Gateway {api_id} no existe")
+            log(f"    ℹ API Gateway {api_id} no existe")
         else:
-            print(f"    ✗ Error: {e}")
+            log(f"    ✗ Error: {e}")
 
 def delete_dynamodb_table(table_name):
     """Elimina tabla DynamoDB."""
-    print(f"\n[*] Eliminando tabla DynamoDB: {table_name}...")
+    log(f"\n[*] Eliminando tabla DynamoDB: {table_name}...")
     try:
         dynamodb_client.delete_table(TableName=table_name)
-        print(f"    ✓ Tabla {table_name} marcada para eliminación")
+        log(f"    ✓ Tabla {table_name} marcada para eliminación")
         
-        # Esperar a que se elimine
+        # Esperar a que se elimine (sondeo cada 3s en lugar de los 20s por defecto)
         waiter = dynamodb_client.get_waiter("table_not_exists")
-        waiter.wait(TableName=table_name)
-        print(f"    ✓ Tabla {table_name} eliminada")
+        waiter.wait(TableName=table_name, WaiterConfig={"Delay": 3, "MaxAttempts": 40})
+        log(f"    ✓ Tabla {table_name} eliminada")
     except ClientError as e:
         if e.response["Error"]["Code"] == "ResourceNotFoundException":
-            print(f"    ℹ Tabla {table_name} no existe")
+            log(f"    ℹ Tabla {table_name} no existe")
         else:
-            print(f"    ✗ Error: {e}")
+            log(f"    ✗ Error: {e}")
 
 def delete_iam_role(role_name):
     """Elimina rol IAM."""
-    print(f"\n[*] Eliminando rol IAM: {role_name}...")
+    log(f"\n[*] Eliminando rol IAM: {role_name}...")
     try:
         # Primero eliminar políticas inline
         try:
@@ -179,39 +243,51 @@ def delete_iam_role(role_name):
                     RoleName=role_name,
                     PolicyName=policy_name
                 )
-                print(f"    ✓ Política {policy_name} eliminada")
+                log(f"    ✓ Política {policy_name} eliminada")
         except:
             pass
         
         iam_client.delete_role(RoleName=role_name)
-        print(f"    ✓ Rol {role_name} eliminado")
+        log(f"    ✓ Rol {role_name} eliminado")
     except ClientError as e:
         if e.response["Error"]["Code"] == "NoSuchEntity":
-            print(f"    ℹ Rol {role_name} no existe")
+            log(f"    ℹ Rol {role_name} no existe")
         else:
-            print(f"    ✗ Error: {e}")
+            log(f"    ✗ Error: {e}")
+
+def delete_sns_topic(topic_arn):
+    """Elimina un topic SNS (DeleteTopic también elimina sus suscripciones)."""
+    try:
+        sns_client.delete_topic(TopicArn=topic_arn)
+        log(f"    ✓ Topic eliminado: {topic_arn}")
+    except ClientError as e:
+        log(f"    ⚠ Error eliminando {topic_arn}: {e}")
 
 def delete_all_low_stock_topics():
     """Elimina todos los topics SNS cuyo nombre contiene 'low-stock'."""
-    print("\n[*] Eliminando todos los topics SNS 'low-stock'...")
-    response = sns_client.list_topics()
-    for topic in response.get("Topics", []):
-        arn = topic["TopicArn"]
-        if "low-stock" in arn:
-            try:
-                # Borrar suscripciones primero
-                subs = sns_client.list_subscriptions_by_topic(TopicArn=arn)
-                for sub in subs.get("Subscriptions", []):
-                    try:
-                        sns_client.unsubscribe(SubscriptionArn=sub["SubscriptionArn"])
-                        print(f"    ✓ Suscripción eliminada: {sub['SubscriptionArn']}")
-                    except ClientError:
-                        pass
-                # Borrar topic
-                sns_client.delete_topic(TopicArn=arn)
-                print(f"    ✓ Topic eliminado: {arn}")
-            except ClientError as e:
-                print(f"    ⚠ Error eliminando {arn}: {e}")
+    log("\n[*] Eliminando todos los topics SNS 'low-stock'...")
+    paginator = sns_client.get_paginator("list_topics")
+    topic_arns = [
+        topic["TopicArn"]
+        for page in paginator.paginate()
+        for topic in page.get("Topics", [])
+        if "low-stock" in topic["TopicArn"].rsplit(":", 1)[-1]
+    ]
+    
+    def delete_topic_captured(topic_arn):
+        """Borra un tema en un hilo auxiliar y devuelve su salida (para volcarla en la tarea)."""
+        output.lines = []
+        try:
+            delete_sns_topic(topic_arn)
+            return output.lines
+        finally:
+            output.lines = None
+    
+    if topic_arns:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            for lines in executor.map(delete_topic_captured, topic_arns):
+                for line in lines:
+                    log(line)
 
 def main():
     print("\n" + "="*60)
@@ -241,33 +317,51 @@ def main():
         except:
             pass
         
-        # 1. Eliminar Lambdas
-        delete_lambda(LAMBDA_LOAD_NAME)
-        delete_lambda(LAMBDA_API_NAME)
-        delete_lambda(LAMBDA_NOTIFY_NAME)
-        
-        # 2. Eliminar API Gateway
-        delete_api_gateway(API_ID)
-        
-        # 3. Eliminar tabla DynamoDB
-        delete_dynamodb_table(TABLE_NAME)
-        
-        # 4. Vaciar y eliminar buckets S3
-        empty_s3_bucket(BUCKET_UPLOADS)
-        delete_s3_bucket(BUCKET_UPLOADS)
-        empty_s3_bucket(BUCKET_WEB)
-        delete_s3_bucket(BUCKET_WEB)
-        
-        # 5. Eliminar rol IAM
-        delete_iam_role(IAM_ROLE)
-        
-        # 6. Eliminar tema SNS
-        delete_all_low_stock_topics()
+        # Las eliminaciones son independientes entre sí: lanzarlas en paralelo
+        # (cada tarea imprime su salida en bloque al terminar, sin mezclarse con las demás)
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            # 1. Eliminar Lambdas
+            lambda_futures = {
+                executor.submit(run_task, delete_lambda, name): f"Lambda {name}"
+                for name in [LAMBDA_LOAD_NAME, LAMBDA_API_NAME, LAMBDA_NOTIFY_NAME]
+            }
+            
+            # 2-4. API Gateway, tabla DynamoDB y buckets S3
+            futures = {
+                executor.submit(run_task, delete_api_gateway, API_ID): f"API Gateway {API_ID}",
+                executor.submit(run_task, delete_dynamodb_table, TABLE_NAME): f"tabla {TABLE_NAME}",
+                executor.submit(run_task, empty_and_delete_s3_bucket, BUCKET_UPLOADS): f"bucket {BUCKET_UPLOADS}",
+                executor.submit(run_task, empty_and_delete_s3_bucket, BUCKET_WEB): f"bucket {BUCKET_WEB}"
+            }
+            
+            # 6. Eliminar tema SNS (directamente por ARN; barrido de 'low-stock' solo si se pide)
+            if CLEANUP_ORPHANS:
+                futures[executor.submit(run_task, delete_all_low_stock_topics)] = "temas SNS"
+            else:
+                futures[executor.submit(run_task, delete_sns_topic, TOPIC_ARN)] = "tema SNS"
+            
+            # 5. Eliminar rol IAM (lo usan las Lambdas: esperar a que estén eliminadas)
+            wait(lambda_futures)
+            futures[executor.submit(run_task, delete_iam_role, IAM_ROLE)] = f"rol {IAM_ROLE}"
+            futures.update(lambda_futures)
+            
+            # Un fallo en una tarea no cancela las demás
+            failed = []
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(futures[future])
+                    with print_lock:
+                        print(f"    ✗ Error eliminando {futures[future]}: {e}")
         
         print("\n" + "="*60)
         print("✓ DESTRUCCIÓN COMPLETADA")
         print("="*60)
-        print("\nTodos los recursos han sido eliminados exitosamente.")
+        if failed:
+            print(f"\n⚠ No se pudieron eliminar: {', '.join(failed)}")
+        else:
+            print("\nTodos los recursos han sido eliminados exitosamente.")
         
     except Exception as e:
         print(f"\n✗ ERROR: {e}")
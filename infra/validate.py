@@ -6,6 +6,8 @@ Verifica que todos los recursos se crearon correctamente
 
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import boto3
 from botocore.exceptions import ClientError
@@ -22,53 +24,101 @@ def load_config():
     with open(config_file, "r") as f:
         return json.load(f)
 
+# Salida por hilo: cada verificación acumula sus líneas para mostrarlas en orden
+output = threading.local()
+
+def log(message=""):
+    """Imprime el mensaje o, si el hilo está capturando salida, lo acumula."""
+    lines = getattr(output, "lines", None)
+    if lines is None:
+        print(message)
+    else:
+        lines.append(message)
+
+def run_check(check, config):
+    """Ejecuta una verificación capturando su salida.
+    
+    Devuelve (líneas generadas, ok). Un error inesperado (credenciales, red...) se
+    añade a las líneas de esa verificación en lugar de ocultar la salida del resto.
+    """
+    output.lines = []
+    try:
+        check(config)
+        return output.lines, True
+    except Exception as e:
+        output.lines.append(f"    ✗ Error inesperado en {check.__name__}: {type(e).__name__}: {e}")
+        return output.lines, False
+    finally:
+        output.lines = None
+
 def check_s3_buckets(config):
     """Verifica buckets S3."""
-    print("\n[*] Verificando S3...")
-    s3 = boto3.client("s3", region_name=config["region"])
+    log("\n[*] Verificando S3...")
+    s3 = boto3.session.Session().client("s3", region_name=config["region"])
     
     buckets = [config["bucket_uploads"], config["bucket_web"]]
     
-    for bucket in buckets:
+    def bucket_exists(bucket):
         try:
             s3.head_bucket(Bucket=bucket)
-            print(f"    ✓ Bucket '{bucket}' existe")
-            
-            # Verificar notificación para bucket de uploads
-            if "uploads" in bucket:
-                try:
-                    notif = s3.get_bucket_notification_configuration(Bucket=bucket)
-                    if "LambdaFunctionConfigurations" in notif:
-                        print(f"    ✓ S3 trigger configurado")
-                except:
-                    print(f"    ⚠ No se pudo verificar trigger")
-                    
-        except ClientError as e:
-            print(f"    ✗ Bucket '{bucket}' no existe o inaccesible")
+            return True
+        except ClientError:
+            return False
+    
+    def get_notification(bucket):
+        try:
+            return s3.get_bucket_notification_configuration(Bucket=bucket)
+        except:
+            return None
+    
+    # head_bucket y la notificación (solo bucket de uploads) se consultan a la vez
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            (
+                bucket,
+                executor.submit(bucket_exists, bucket),
+                executor.submit(get_notification, bucket) if "uploads" in bucket else None
+            )
+            for bucket in buckets
+        ]
+        
+        for bucket, exists_future, notif_future in futures:
+            if exists_future.result():
+                log(f"    ✓ Bucket '{bucket}' existe")
+                
+                # Verificar notificación para bucket de uploads
+                if notif_future is not None:
+                    notif = notif_future.result()
+                    if notif is None:
+                        log(f"    ⚠ No se pudo verificar trigger")
+                    elif "LambdaFunctionConfigurations" in notif:
+                        log(f"    ✓ S3 trigger configurado")
+            else:
+                log(f"    ✗ Bucket '{bucket}' no existe o inaccesible")
 
 def check_dynamodb(config):
     """Verifica DynamoDB."""
-    print("\n[*] Verificando DynamoDB...")
-    ddb = boto3.client("dynamodb", region_name=config["region"])
+    log("\n[*] Verificando DynamoDB...")
+    ddb = boto3.session.Session().client("dynamodb", region_name=config["region"])
     
     try:
         response = ddb.describe_table(TableName=config["table_name"])
         table = response["Table"]
         
-        print(f"    ✓ Tabla '{config['table_name']}' existe")
-        print(f"    ✓ Estado: {table['TableStatus']}")
-        print(f"    ✓ Items: {table['ItemCount']}")
+        log(f"    ✓ Tabla '{config['table_name']}' existe")
+        log(f"    ✓ Estado: {table['TableStatus']}")
+        log(f"    ✓ Items: {table['ItemCount']}")
         
         if "StreamSpecification" in table:
-            print(f"    ✓ Streams: {table['StreamSpecification'].get('StreamViewType', 'N/A')}")
+            log(f"    ✓ Streams: {table['StreamSpecification'].get('StreamViewType', 'N/A')}")
     
     except ClientError:
-        print(f"    ✗ Tabla '{config['table_name']}' no existe")
+        log(f"    ✗ Tabla '{config['table_name']}' no existe")
 
 def check_lambdas(config):
     """Verifica Lambdas."""
-    print("\n[*] Verificando Lambda Functions...")
-    lam = boto3.client("lambda", region_name=config["region"])
+    log("\n[*] Verificando Lambda Functions...")
+    lam = boto3.session.Session().client("lambda", region_name=config["region"])
     
     lambdas = [
         config["lambda_load"],
@@ -76,31 +126,39 @@ def check_lambdas(config):
         config["lambda_notify"]
     ]
     
-    for func in lambdas:
+    def get_function(func):
         try:
-            response = lam.get_function(FunctionName=func)
+            return lam.get_function(FunctionName=func)
+        except ClientError:
+            return None
+    
+    # Consultar las tres Lambdas a la vez
+    with ThreadPoolExecutor(max_workers=len(lambdas)) as executor:
+        responses = list(executor.map(get_function, lambdas))
+    
+    for func, response in zip(lambdas, responses):
+        if response:
             config_data = response["Configuration"]
             
-            print(f"    ✓ Lambda '{func}' existe")
-            print(f"      Runtime: {config_data['Runtime']}")
-            print(f"      Memory: {config_data['MemorySize']} MB")
-            print(f"      Timeout: {config_data['Timeout']}s")
-            
-        except ClientError:
-            print(f"    ✗ Lambda '{func}' no existe")
+            log(f"    ✓ Lambda '{func}' existe")
+            log(f"      Runtime: {config_data['Runtime']}")
+            log(f"      Memory: {config_data['MemorySize']} MB")
+            log(f"      Timeout: {config_data['Timeout']}s")
+        else:
+            log(f"    ✗ Lambda '{func}' no existe")
 
 def check_api_gateway(config):
     """Verifica API Gateway."""
-    print("\n[*] Verificando API Gateway...")
-    apigw = boto3.client("apigatewayv2", region_name=config["region"])
+    log("\n[*] Verificando API Gateway...")
+    apigw = boto3.session.Session().client("apigatewayv2", region_name=config["region"])
     
     try:
         response = apigw.get_api(ApiId=config["api_id"])
         api = response
         
-        print(f"    ✓ API '{api['Name']}' existe")
-        print(f"    ✓ Protocolo: {api['ProtocolType']}")
-        print(f"    ✓ Endpoint: {config['api_endpoint']}")
+        log(f"    ✓ API '{api['Name']}' existe")
+        log(f"    ✓ Protocolo: {api['ProtocolType']}")
+        log(f"    ✓ Endpoint: {config['api_endpoint']}")
         
         # Verificar rutas
         routes = apigw.get_routes(ApiId=config["api_id"])
@@ -108,60 +166,60 @@ def check_api_gateway(config):
         
         for route in route_keys:
             if "GET" in route:
-                print(f"    ✓ Ruta: {route}")
+                log(f"    ✓ Ruta: {route}")
                 
     except ClientError as e:
-        print(f"    ✗ API Gateway no existe o inaccesible: {e}")
+        log(f"    ✗ API Gateway no existe o inaccesible: {e}")
 
 def check_sns(config):
     """Verifica SNS."""
-    print("\n[*] Verificando SNS...")
-    sns = boto3.client("sns", region_name=config["region"])
+    log("\n[*] Verificando SNS...")
+    sns = boto3.session.Session().client("sns", region_name=config["region"])
     
     try:
         response = sns.get_topic_attributes(TopicArn=config["sns_topic_arn"])
         
-        print(f"    ✓ Tema SNS existe")
-        print(f"    ✓ ARN: {config['sns_topic_arn']}")
+        log(f"    ✓ Tema SNS existe")
+        log(f"    ✓ ARN: {config['sns_topic_arn']}")
         
         # Listar suscripciones
         subs = sns.list_subscriptions_by_topic(TopicArn=config["sns_topic_arn"])
         sub_count = len(subs.get("Subscriptions", []))
-        print(f"    ✓ Suscripciones: {sub_count}")
+        log(f"    ✓ Suscripciones: {sub_count}")
         
         for sub in subs.get("Subscriptions", []):
             status = sub.get("SubscriptionArn", "Pendiente")
             endpoint = sub.get("Endpoint", "N/A")
             if "PendingConfirmation" not in status:
-                print(f"      ✓ Email confirmado: {endpoint}")
+                log(f"      ✓ Email confirmado: {endpoint}")
             else:
-                print(f"      ⚠ Email pendiente de confirmación: {endpoint}")
+                log(f"      ⚠ Email pendiente de confirmación: {endpoint}")
         
     except ClientError:
-        print(f"    ✗ Tema SNS no existe")
+        log(f"    ✗ Tema SNS no existe")
 
 def check_iam(config):
     """Verifica IAM."""
-    print("\n[*] Verificando IAM...")
-    iam = boto3.client("iam")
+    log("\n[*] Verificando IAM...")
+    iam = boto3.session.Session().client("iam")
     
     try:
         response = iam.get_role(RoleName=config["iam_role"])
         
-        print(f"    ✓ Rol IAM '{config['iam_role']}' existe")
+        log(f"    ✓ Rol IAM '{config['iam_role']}' existe")
         
         # Listar políticas
         policies = iam.list_role_policies(RoleName=config["iam_role"])
         
         for policy in policies.get("PolicyNames", []):
-            print(f"      ✓ Política: {policy}")
+            log(f"      ✓ Política: {policy}")
         
     except ClientError:
-        print(f"    ✗ Rol IAM '{config['iam_role']}' no existe")
+        log(f"    ✗ Rol IAM '{config['iam_role']}' no existe")
 
 def test_api_endpoint(config):
     """Prueba el endpoint de la API."""
-    print("\n[*] Probando API Endpoint...")
+    log("\n[*] Probando API Endpoint...")
     
     try:
         import urllib.request
@@ -169,7 +227,7 @@ def test_api_endpoint(config):
         
         url = f"{config['api_endpoint']}/items"
         
-        print(f"    Llamando: GET {url}")
+        log(f"    Llamando: GET {url}")
         
         req = urllib.request.Request(url, method='GET')
         req.add_header('User-Agent', 'AWS-Serverless-Test')
@@ -177,15 +235,15 @@ def test_api_endpoint(config):
         with urllib.request.urlopen(req, timeout=10) as response:
             data = json.loads(response.read().decode())
             
-            print(f"    ✓ API respondió correctamente")
-            print(f"    ✓ Items en BD: {data.get('count', 0)}")
+            log(f"    ✓ API respondió correctamente")
+            log(f"    ✓ Items en BD: {data.get('count', 0)}")
             
             if data.get('items'):
-                print(f"    ✓ Primer item: {data['items'][0]}")
+                log(f"    ✓ Primer item: {data['items'][0]}")
     
     except Exception as e:
-        print(f"    ⚠ Error al probar API: {e}")
-        print(f"    ℹ Esto es normal si aún no has subido datos a S3")
+        log(f"    ⚠ Error al probar API: {e}")
+        log(f"    ℹ Esto es normal si aún no has subido datos a S3")
 
 def main():
     print("\n" + "="*60)
@@ -199,13 +257,30 @@ def main():
     print(f"\nVerificando despliegue del suffix: {config['suffix']}")
     print(f"Región: {config['region']}")
     
-    check_s3_buckets(config)
-    check_dynamodb(config)
-    check_lambdas(config)
-    check_api_gateway(config)
-    check_sns(config)
-    check_iam(config)
-    test_api_endpoint(config)
+    # Las verificaciones son independientes: lanzarlas en paralelo y mostrar
+    # su salida en el orden habitual
+    checks = [
+        check_s3_buckets,
+        check_dynamodb,
+        check_lambdas,
+        check_api_gateway,
+        check_sns,
+        check_iam,
+        test_api_endpoint
+    ]
+    
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        results = list(executor.map(lambda check: run_check(check, config), checks))
+    
+    for lines, ok in results:
+        for line in lines:
+            print(line)
+    
+    if not all(ok for lines, ok in results):
+        print("\n" + "="*60)
+        print("✗ VALIDACIÓN INCOMPLETA (ver errores arriba)")
+        print("="*60)
+        sys.exit(1)
     
     print("\n" + "="*60)
     print("✓ VALIDACIÓN COMPLETADA")
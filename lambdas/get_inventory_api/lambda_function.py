@@ -6,44 +6,123 @@ Rutas:
   GET /items/{store} -> Items de una tienda específica
 """
 
+import hashlib
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
 
-dynamodb = boto3.resource("dynamodb")
+# Pool amplio para las llamadas concurrentes y reintentos adaptativos ante throttling
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    connect_timeout=2,
+    read_timeout=5,
+    tcp_keepalive=True
+)
+
+dynamodb = boto3.client("dynamodb", config=BOTO_CONFIG)
 
 TABLE_NAME = os.environ["TABLE_NAME"]
 REGION = os.environ.get("REGION", "eu-west-1")
+DEBUG = os.environ.get("DEBUG") == "1"  # Volcar eventos completos en CloudWatch
 
-table = dynamodb.Table(TABLE_NAME)
+# Reutilizados entre invocaciones en caliente
+scan_paginator = dynamodb.get_paginator("scan")
+deserializer = TypeDeserializer()
 
+SCAN_SEGMENTS = 4  # Segmentos del scan paralelo en GET /items
+CACHE_TTL_SECONDS = 5  # Vigencia de las respuestas cacheadas (retraso máximo tras cargar un CSV)
+CACHE_MAX_ENTRIES = 128  # Límite de rutas cacheadas (la tienda viene del path del cliente)
 
-def decimal_default(obj):
-    """Serializar Decimal a float para JSON."""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+# Caché de respuestas por ruta (persiste entre invocaciones en caliente)
+response_cache = {}
 
 
-def get_all_items():
-    """Obtiene todos los items del inventario."""
-    try:
-        response = table.scan()
-        items = response.get("Items", [])
-        
-        # Manejar paginación
-        while "LastEvaluatedKey" in response:
-            response = table.scan(ExclusiveStartKey=response["LastEvaluatedKey"])
-            items.extend(response.get("Items", []))
-        
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "items": items,
-                "count": len(items)
-            }, default=decimal_default)
+def to_json_value(value):
+    """Convierte los Decimal de DynamoDB a int/float (serializables a JSON), también dentro de M/L."""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, dict):
+        return {key: to_json_value(nested) for key, nested in value.items()}
+    if isinstance(value, (list, set)):
+        return [to_json_value(nested) for nested in value]
+    return value
+
+
+def deserialize_item(item):
+    """Convierte un item en formato DynamoDB ({"S": ...}) a tipos Python serializables a JSON."""
+    return {key: to_json_value(deserializer.deserialize(value)) for key, value in item.items()}
+
+
+def scan_segment(segment):
+    """Escanea un segmento de la tabla (el paginador maneja LastEvaluatedKey)."""
+    pages = scan_paginator.paginate(
+        TableName=TABLE_NAME,
+        Segment=segment,
+        TotalSegments=SCAN_SEGMENTS,
+        ProjectionExpression="#store, #item, #count",
+        ExpressionAttributeNames={"#store": "Store", "#item": "Item", "#count": "Count"}
+    )
+    return [deserialize_item(item) for page in pages for item in page.get("Items", [])]
+
+
+def store_in_cache(cache_key, entry, now):
+    """Guarda una respuesta descartando las caducadas y, si sigue llena, las más antiguas."""
+    for key in [key for key, cached in response_cache.items() if now - cached["ts"] > CACHE_TTL_SECONDS]:
+        del response_cache[key]
+    
+    # Reinsertar al final: el dict conserva el orden de inserción (más antigua primero)
+    response_cache.pop(cache_key, None)
+    while len(response_cache) >= CACHE_MAX_ENTRIES:
+        del response_cache[next(iter(response_cache))]
+    response_cache[cache_key] = entry
+
+
+def cached_response(cache_key, build_body, if_none_match=None):
+    """
+    Devuelve la respuesta desde la caché del contenedor (si no ha caducado)
+    o la genera con build_body(). Responde 304 si el ETag del cliente coincide.
+    """
+    entry = response_cache.get(cache_key)
+    now = time.time()
+    
+    if entry is None or now - entry["ts"] > CACHE_TTL_SECONDS:
+        body = build_body()
+        entry = {
+            "etag": f'"{hashlib.md5(body.encode()).hexdigest()}"',
+            "body": body,
+            "ts": now
         }
+        store_in_cache(cache_key, entry, now)
+    
+    headers = {"ETag": entry["etag"]}
+    
+    if if_none_match and entry["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    
+    return {"statusCode": 200, "headers": headers, "body": entry["body"]}
+
+
+def get_all_items(if_none_match=None):
+    """Obtiene todos los items del inventario (scan paralelo por segmentos)."""
+    def build_body():
+        items = []
+        with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as executor:
+            for segment_items in executor.map(scan_segment, range(SCAN_SEGMENTS)):
+                items.extend(segment_items)
+        
+        return json.dumps({
+            "items": items,
+            "count": len(items)
+        })
+    
+    try:
+        return cached_response("items", build_body, if_none_match)
     except Exception as e:
         return {
             "statusCode": 500,
@@ -51,24 +130,25 @@ def get_all_items():
         }
 
 
-def get_items_by_store(store):
+def get_items_by_store(store, if_none_match=None):
     """Obtiene items de una tienda específica."""
-    try:
-        response = table.query(
+    def build_body():
+        response = dynamodb.query(
+            TableName=TABLE_NAME,
             KeyConditionExpression="#store = :store",
             ExpressionAttributeNames={"#store": "Store"},
-            ExpressionAttributeValues={":store": store}
+            ExpressionAttributeValues={":store": {"S": store}}
         )
-        items = response.get("Items", [])
+        items = [deserialize_item(item) for item in response.get("Items", [])]
         
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "store": store,
-                "items": items,
-                "count": len(items)
-            }, default=decimal_default)
-        }
+        return json.dumps({
+            "store": store,
+            "items": items,
+            "count": len(items)
+        })
+    
+    try:
+        return cached_response(f"items/{store}", build_body, if_none_match)
     except Exception as e:
         return {
             "statusCode": 500,
@@ -84,12 +164,15 @@ def lambda_handler(event, context):
     - GET /items -> todos los items
     - GET /items/{store} -> items de una tienda específica
     """
-    print(f"Event completo: {json.dumps(event, default=str)}")
+    if DEBUG:
+        print(f"Event completo: {json.dumps(event, default=str)}")
     
     # Obtener información de la solicitud
     path = event.get("rawPath", "")
     route_key = event.get("routeKey", "")
     path_params = event.get("pathParameters") or {}
+    headers = event.get("headers") or {}
+    if_none_match = headers.get("if-none-match")
     
     print(f"Path: {path}")
     print(f"Route Key: {route_key}")
@@ -113,12 +196,12 @@ def lambda_handler(event, context):
     # Si tenemos un store, consultar por tienda
     if store:
         print(f"Consultando items para tienda: {store}")
-        return get_items_by_store(store)
+        return get_items_by_store(store, if_none_match)
     
     # Si no hay tienda específica, obtener todos
     elif "/items" in route_key or "/items" in path:
         print(f"Consultando todos los items")
-        return get_all_items()
+        return get_all_items(if_none_match)
     
     else:
         print(f"Ruta no reconocida")
@@ -4,20 +4,140 @@ Lee archivos CSV del S3 y carga registros en DynamoDB.
 Disparada por eventos PutObject de S3.
 """
 
+import io
 import json
 import csv
-import io
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal
 import boto3
+from boto3.dynamodb.table import BatchWriter
+from botocore.config import Config
 
-dynamodb = boto3.resource("dynamodb")
-s3 = boto3.client("s3")
+# Pool amplio para las llamadas concurrentes y reintentos adaptativos ante throttling
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    connect_timeout=2,
+    read_timeout=5,
+    tcp_keepalive=True
+)
+
+dynamodb = boto3.resource("dynamodb", config=BOTO_CONFIG)
+s3 = boto3.client("s3", config=BOTO_CONFIG)
 
 TABLE_NAME = os.environ["TABLE_NAME"]
 REGION = os.environ.get("REGION", "eu-west-1")
+DEBUG = os.environ.get("DEBUG") == "1"  # Volcar eventos completos en CloudWatch
+
+# Los recursos boto3 no son thread-safe; los clientes sí. El cliente del recurso
+# (meta.client) acepta tipos Python, así que los hilos escriben a través de él.
+dynamodb_client = dynamodb.meta.client
+
+DEPLOY_PREFIX = "_deploy/"  # Paquetes de las Lambdas que deploy.py sube al mismo bucket
+
+BATCH_SIZE = 25  # Máximo de items por BatchWriteItem
+MAX_STORE_BYTES = 2048  # Límite de DynamoDB para la clave de partición
+MAX_ITEM_BYTES = 1024  # Límite de DynamoDB para la clave de ordenación
+
 
-table = dynamodb.Table(TABLE_NAME)
+def validate_keys(store, item):
+    """Comprueba que la clave cumple las restricciones de DynamoDB (evita que falle el lote entero)."""
+    if not store or not item:
+        raise ValueError("Store e Item no pueden estar vacíos")
+    if len(store.encode("utf-8")) > MAX_STORE_BYTES:
+        raise ValueError(f"Store supera {MAX_STORE_BYTES} bytes")
+    if len(item.encode("utf-8")) > MAX_ITEM_BYTES:
+        raise ValueError(f"Item supera {MAX_ITEM_BYTES} bytes")
+
+
+def write_batch(items):
+    """Escribe un lote (<= 25 items) con BatchWriteItem; batch_writer reintenta los no procesados."""
+    with BatchWriter(TABLE_NAME, dynamodb_client) as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
+def process_record(record):
+    """Descarga un CSV de S3 y carga sus filas en DynamoDB. Devuelve las filas insertadas."""
+    bucket = record["s3"]["bucket"]["name"]
+    key = record["s3"]["object"]["key"]
+    
+    if key.startswith(DEPLOY_PREFIX):
+        print(f"Omitido (paquete de despliegue): s3://{bucket}/{key}")
+        return 0
+    
+    print(f"Procesando: s3://{bucket}/{key}")
+    
+    # Descargar CSV en streaming: se parsea a medida que llega, sin cargarlo entero en memoria
+    response = s3.get_object(Bucket=bucket, Key=key)
+    # (TextIOWrapper lee del body en bloques grandes; StreamingBody es un IOBase)
+    csv_stream = io.TextIOWrapper(response["Body"], encoding="utf-8", newline="")
+    
+    # Parsear CSV (índices de columna resueltos una vez desde la cabecera)
+    csv_reader = csv.reader(csv_stream)
+    items_inserted = 0
+    rows_skipped = 0
+    errors = []  # Filas y lotes fallidos, se registran juntos al final
+    
+    header = next(csv_reader, None)
+    if header is None:
+        print(f"CSV vacío: s3://{bucket}/{key}")
+        return items_inserted
+    
+    header = [column.strip() for column in header]
+    store_idx = header.index("Store")
+    item_idx = header.index("Item")
+    count_idx = header.index("Count")
+    
+    # Lote pendiente indexado por clave: una clave repetida sobrescribe la anterior
+    # (BatchWriteItem rechaza claves duplicadas en la misma petición)
+    pending = {}
+    pending_rows = 0
+    
+    def flush():
+        """Escribe el lote pendiente; si falla, se cuenta como error de lote, no de fila."""
+        nonlocal items_inserted, rows_skipped, pending_rows
+        if not pending:
+            return
+        try:
+            write_batch(list(pending.values()))
+            items_inserted += pending_rows
+        except Exception as e:
+            rows_skipped += pending_rows
+            errors.append(f"  ✗ Lote de {pending_rows} filas (hasta fila {csv_reader.line_num}): {e}")
+        pending.clear()
+        pending_rows = 0
+    
+    # Escritura en lotes de 25 (BatchWriteItem) con reintentos automáticos
+    for row in csv_reader:
+        try:
+            store = row[store_idx].strip()
+            item = row[item_idx].strip()
+            count = int(row[count_idx])
+            validate_keys(store, item)
+        except Exception as e:
+            rows_skipped += 1
+            errors.append(f"  ✗ Fila {csv_reader.line_num}: {e}")
+            continue
+        
+        pending[(store, item)] = {
+            "Store": store,
+            "Item": item,
+            "Count": count
+        }
+        pending_rows += 1
+        
+        if len(pending) == BATCH_SIZE:
+            flush()
+    
+    flush()
+    
+    # Un único log por archivo (resumen + errores agrupados) en lugar de uno por fila
+    print(f"s3://{bucket}/{key}: {items_inserted} insertados / {rows_skipped} omitidos")
+    if errors:
+        print("\n".join(errors))
+    return items_inserted
 
 
 def lambda_handler(event, context):
@@ -30,48 +150,20 @@ def lambda_handler(event, context):
     Berlin,Widget-002,50
     """
     
-    print(f"Event: {json.dumps(event)}")
+    if DEBUG:
+        print(f"Event: {json.dumps(event)}")
     
     try:
         # Obtener detalles del objeto S3
         records = event.get("Records", [])
+        items_inserted = 0
         
-        for record in records:
-            bucket = record["s3"]["bucket"]["name"]
-            key = record["s3"]["object"]["key"]
-            
-            print(f"Procesando: s3://{bucket}/{key}")
-            
-            # Descargar CSV
-            response = s3.get_object(Bucket=bucket, Key=key)
-            csv_content = response["Body"].read().decode("utf-8")
-            
-            # Parsear CSV
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
-            items_inserted = 0
-            
-            for row in csv_reader:
-                try:
-                    store = row["Store"].strip()
-                    item = row["Item"].strip()
-                    count = int(row["Count"])
-                    
-                    # Insertar en DynamoDB
-                    table.put_item(
-                        Item={
-                            "Store": store,
-                            "Item": item,
-                            "Count": count
-                        }
-                    )
-                    items_inserted += 1
-                    print(f"  ✓ Insertado: {store} - {item} (x{count})")
-                
-                except Exception as e:
-                    print(f"  ✗ Error al insertar fila: {e}")
-                    continue
-            
-            print(f"Total insertados: {items_inserted}")
+        # Procesar los CSV en paralelo (descargas S3 y escrituras DynamoDB se solapan)
+        if records:
+            with ThreadPoolExecutor(max_workers=min(10, len(records))) as executor:
+                futures = [executor.submit(process_record, record) for record in records]
+                for future in as_completed(futures):
+                    items_inserted += future.result()
         
         return {
             "statusCode": 200,
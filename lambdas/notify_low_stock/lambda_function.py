@@ -8,14 +8,26 @@ import json
 import os
 from decimal import Decimal
 import boto3
+from botocore.config import Config
 
-sns = boto3.client("sns")
+# Pool amplio para las llamadas concurrentes y reintentos adaptativos ante throttling
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    connect_timeout=2,
+    read_timeout=5,
+    tcp_keepalive=True
+)
+
+sns = boto3.client("sns", config=BOTO_CONFIG)
 
 TABLE_NAME = os.environ["TABLE_NAME"]
 TOPIC_ARN = os.environ["TOPIC_ARN"]
 REGION = os.environ.get("REGION", "eu-west-1")
+DEBUG = os.environ.get("DEBUG") == "1"  # Volcar eventos y detalle por registro en CloudWatch
 
 LOW_STOCK_THRESHOLD = 50
+SNS_BATCH_SIZE = 10  # Máximo de mensajes por llamada a PublishBatch
 
 
 def lambda_handler(event, context):
@@ -23,19 +35,21 @@ def lambda_handler(event, context):
     Procesa eventos de DynamoDB Streams.
     Envía notificación por SNS cuando el stock está bajo.
     """
-    print(f"Event: {json.dumps(event, default=str)}")
+    if DEBUG:
+        print(f"Event: {json.dumps(event, default=str)}")
     
     try:
         records = event.get("Records", [])
         print(f"Total registros recibidos: {len(records)}")
         
-        notified_count = 0
+        notifications = []  # Entradas para PublishBatch
         
         for i, record in enumerate(records):
             # Obtener el tipo de evento
             event_name = record["eventName"]  # INSERT, MODIFY, REMOVE
             
-            print(f"\n[Registro {i+1}] Tipo de evento: {event_name}")
+            if DEBUG:
+                print(f"\n[Registro {i+1}] Tipo de evento: {event_name}")
             
             # Obtener los datos nuevos/antiguos
             if event_name in ["INSERT", "MODIFY"]:
@@ -46,7 +60,8 @@ def lambda_handler(event, context):
                 item = new_image.get("Item", {}).get("S", "Unknown")
                 count = int(new_image.get("Count", {}).get("N", 0))
                 
-                print(f"  Store: {store}, Item: {item}, Stock: {count}")
+                if DEBUG:
+                    print(f"  Store: {store}, Item: {item}, Stock: {count}")
                 
                 # Verificar stock bajo
                 if count < LOW_STOCK_THRESHOLD:
@@ -63,23 +78,34 @@ Por favor, reabastecer inmediatamente.
                     
                     subject = f"[ALERTA] Stock bajo: {item} en {store}"
                     
-                    try:
-                        sns.publish(
-                            TopicArn=TOPIC_ARN,
-                            Subject=subject,
-                            Message=message
-                        )
-                        print(f"  ✓ Notificación SNS enviada para {item}")
-                        notified_count += 1
-                    except Exception as e:
-                        print(f"  ✗ Error al enviar SNS: {e}")
-                else:
+                    notifications.append({
+                        "Id": str(i + 1),
+                        "Subject": subject,
+                        "Message": message
+                    })
+                elif DEBUG:
                     print(f"  ℹ Stock OK ({count} >= {LOW_STOCK_THRESHOLD}), sin notificación")
             elif event_name == "REMOVE":
-                print(f"  ℹ Evento REMOVE ignorado (sin notificación)")
+                if DEBUG:
+                    print(f"  ℹ Evento REMOVE ignorado (sin notificación)")
             else:
                 print(f"  ⚠ Tipo de evento desconocido: {event_name}")
         
+        # Enviar las notificaciones en lotes de 10 (máximo de PublishBatch)
+        notified_count = 0
+        for start in range(0, len(notifications), SNS_BATCH_SIZE):
+            entries = notifications[start:start + SNS_BATCH_SIZE]
+            try:
+                response = sns.publish_batch(
+                    TopicArn=TOPIC_ARN,
+                    PublishBatchRequestEntries=entries
+                )
+                notified_count += len(response.get("Successful", []))
+                for failed in response.get("Failed", []):
+                    print(f"  ✗ Error al enviar SNS (registro {failed['Id']}): {failed.get('Message')}")
+            except Exception as e:
+                print(f"  ✗ Error al enviar SNS: {e}")
+        
         print(f"\n✓ Resumen: {notified_count} notificaciones enviadas")
         
         return {